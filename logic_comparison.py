@@ -1,5 +1,8 @@
 import pandas as pd
 
+from logic_jet import to_numeric_safe
+
+
 def compare_trial_balances(calculated_tb, post_tb):
     """
     계산된 당기 시산표와 실제 당기 시산표를 비교하고, 차이가 있는 항목을 찾아 데이터프레임으로 반환합니다.
@@ -13,26 +16,27 @@ def compare_trial_balances(calculated_tb, post_tb):
         pd.DataFrame: 차이가 발생한 항목들에 대한 상세 정보가 담긴 데이터프레임. 차이가 없으면 빈 데이터프레임.
     """
     # --- 1. 데이터 정제 ---
+    # 비교에 필요한 컬럼만 먼저 골라내어, 이후 변환과 병합에서 나머지 컬럼을 복사하지 않습니다.
     # 비교를 위해 양쪽 데이터프레임의 데이터 타입을 정수형으로 통일합니다.
-    for col in ['차변잔액', '대변잔액']:
-        calculated_tb[col] = pd.to_numeric(calculated_tb[col], errors='coerce').fillna(0).astype(int)
-        post_tb[col] = pd.to_numeric(post_tb[col], errors='coerce').fillna(0).astype(int)
+    balance_cols = ['차변잔액', '대변잔액']
+    calculated = calculated_tb.set_index('계정코드')[['계정과목'] + balance_cols]
+    original = post_tb.set_index('계정코드')[['계정과목'] + balance_cols]
+    calculated[balance_cols] = to_numeric_safe(calculated[balance_cols]).astype(int)
+    original[balance_cols] = to_numeric_safe(original[balance_cols]).astype(int)
 
     # --- 2. 데이터 비교 ---
     # 계정코드를 기준으로 두 데이터프레임을 병합합니다.
     # _계산, _원본 접미사를 붙여 출처를 구분합니다.
-    comparison_df = pd.merge(
-        calculated_tb,
-        post_tb,
-        on='계정코드',
-        suffixes=('_계산', '_원본'),
-        how='outer'
-    )
-    # 병합 후 NaN 값은 0으로 채웁니다. (한쪽에만 존재하는 계정 처리)
-    comparison_df.fillna(0, inplace=True)
-    
-    # 계정과목 열을 정리합니다. (원본 데이터의 계정과목을 우선 사용)
-    comparison_df['계정과목'] = comparison_df['계정과목_원본'].combine_first(comparison_df['계정과목_계산'])
+    comparison_df = calculated.join(
+        original,
+        how='outer',
+        lsuffix='_계산',
+        rsuffix='_원본'
+    ).reset_index()
+    # 병합 후 금액 컬럼의 NaN 값은 한 번의 블록 연산으로 0으로 채웁니다. (한쪽에만 존재하는 계정 처리)
+    # 계정과목 컬럼은 NaN으로 남겨 두어야 아래 combine_first가 다른 쪽 계정과목으로 보완할 수 있습니다.
+    amount_cols = ['차변잔액_계산', '대변잔액_계산', '차변잔액_원본', '대변잔액_원본']
+    comparison_df[amount_cols] = comparison_df[amount_cols].fillna(0)
 
 
     # --- 3. 차이 계산 및 필터링 ---
@@ -40,18 +44,23 @@ def compare_trial_balances(calculated_tb, post_tb):
     comparison_df['차변차이'] = comparison_df['차변잔액_계산'] - comparison_df['차변잔액_원본']
     comparison_df['대변차이'] = comparison_df['대변잔액_계산'] - comparison_df['대변잔액_원본']
 
-    # 차이가 0이 아닌 행들만 필터링합니다.
-    diff_df = comparison_df[
-        (comparison_df['차변차이'] != 0) |
-        (comparison_df['대변차이'] != 0)
-    ].copy()
-
-    # 보기 좋게 컬럼 순서를 정리합니다.
-    if not diff_df.empty:
-        diff_df = diff_df[[
-            '계정코드', '계정과목',
-            '차변잔액_계산', '차변잔액_원본', '차변차이',
-            '대변잔액_계산', '대변잔액_원본', '대변차이'
-        ]]
-    
+    # 차이가 0이 아닌 행들만 필터링합니다. 필터 조건은 numpy 배열에서 한 번에 계산하고,
+    # 결과에 필요한 컬럼만 같은 .loc 안에서 골라 나머지 컬럼은 복사하지 않습니다.
+    has_diff = (comparison_df['차변차이'].to_numpy() != 0) | (comparison_df['대변차이'].to_numpy() != 0)
+    diff_rows = comparison_df.loc[has_diff, [
+        '계정코드', '계정과목_원본', '계정과목_계산',
+        '차변잔액_계산', '차변잔액_원본', '차변차이',
+        '대변잔액_계산', '대변잔액_원본', '대변차이'
+    ]]
+
+    # 계정과목 열은 차이가 발생한 행에 대해서만 정리합니다. (원본 데이터의 계정과목을 우선 사용)
+    # assign으로 새 데이터프레임을 만들고, 보기 좋게 컬럼 순서를 정리합니다.
+    diff_df = diff_rows.assign(
+        계정과목=diff_rows['계정과목_원본'].combine_first(diff_rows['계정과목_계산'])
+    )[[
+        '계정코드', '계정과목',
+        '차변잔액_계산', '차변잔액_원본', '차변차이',
+        '대변잔액_계산', '대변잔액_원본', '대변차이'
+    ]]
+
     return diff_df
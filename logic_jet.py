@@ -1,5 +1,34 @@
+import numpy as np
 import pandas as pd
 
+# --------------------------------------------------------------------------------
+# 공통 기능: 금액 컬럼 전처리 함수 (Common Function: Amount Column Preprocessing)
+# --------------------------------------------------------------------------------
+def to_numeric_safe(data):
+    """
+    금액 컬럼을 숫자형으로 변환합니다. 천단위 구분 쉼표(,)를 제거한 뒤 벡터화된 pd.to_numeric으로 변환하며,
+    변환할 수 없는 값은 0으로 채웁니다.
+    데이터프레임이 주어지면 여러 컬럼을 1차원으로 펼쳐 한 번의 문자열 치환과 숫자 변환으로 처리합니다.
+    이미 숫자형인 컬럼은 문자열 변환 없이 결측치만 0으로 채웁니다.
+
+    Args:
+        data (pd.Series | pd.DataFrame): 변환할 금액 컬럼(들)
+
+    Returns:
+        pd.Series | pd.DataFrame: 숫자형으로 변환된 컬럼(들)
+    """
+    if isinstance(data, pd.DataFrame):
+        if all(pd.api.types.is_numeric_dtype(dtype) for dtype in data.dtypes):
+            return data.fillna(0)
+        flat = to_numeric_safe(pd.Series(data.to_numpy().ravel()))
+        return pd.DataFrame(flat.to_numpy().reshape(data.shape), index=data.index, columns=data.columns)
+
+    if pd.api.types.is_numeric_dtype(data):
+        return data.fillna(0)
+    cleaned = data.astype(str).str.replace(',', '', regex=False)
+    return pd.to_numeric(cleaned, errors='coerce').fillna(0)
+
+
 # --------------------------------------------------------------------------------
 # 기존 기능: 시산표 계산 함수 (Original Function: Trial Balance Calculation)
 # --------------------------------------------------------------------------------
@@ -50,26 +79,32 @@ def calculate_trial_balance(pre_tb_df, journal_df, post_tb_df):
     if '차변진액' in pre_tb_df.columns:
         pre_tb_df.rename(columns={'차변진액': '차변잔액'}, inplace=True)
 
-    journal_df['차변금액'] = pd.to_numeric(journal_df['차변금액'], errors='coerce').fillna(0)
-    journal_df['대변금액'] = pd.to_numeric(journal_df['대변금액'], errors='coerce').fillna(0)
-    journal_sum = journal_df.groupby('계정코드')[['차변금액', '대변금액']].sum().reset_index()
+    amount_cols = ['차변금액', '대변금액']
+    journal_df[amount_cols] = to_numeric_safe(journal_df[amount_cols])
+    # 계정코드를 정수 코드로 한 번만 인코딩한 뒤 np.bincount로 차/대변 합계를 집계합니다.
+    codes, accounts = pd.factorize(journal_df['계정코드'], sort=True)
+    valid = codes >= 0
+    journal_sum = pd.DataFrame(
+        {col: np.bincount(codes[valid], weights=journal_df[col].to_numpy()[valid], minlength=len(accounts))
+         for col in ['차변금액', '대변금액']},
+        index=pd.Index(accounts, name='계정코드'),
+    )
 
     # --- 2. 데이터 병합 ---
-    merged_tb = pd.merge(pre_tb_df, journal_sum, on='계정코드', how='outer').fillna(0)
+    pre_tb = to_numeric_safe(pre_tb_df.set_index('계정코드')[['차변잔액', '대변잔액']])
+    merged_tb = pre_tb.join(journal_sum, how='outer').fillna(0)
 
     # --- 3. 기말 잔액 계산 ---
     balance = (merged_tb['차변잔액'] + merged_tb['차변금액']) - \
               (merged_tb['대변잔액'] + merged_tb['대변금액'])
-    merged_tb['계산된_차변잔액'] = balance.where(balance >= 0, 0).astype(int)
-    merged_tb['계산된_대변잔액'] = abs(balance.where(balance < 0, 0)).astype(int)
+    merged_tb['계산된_차변잔액'] = np.where(balance >= 0, balance, 0).astype(int)
+    merged_tb['계산된_대변잔액'] = np.where(balance < 0, -balance, 0).astype(int)
 
     # --- 4. 최종 데이터 정리 ---
-    if '계정과목' in merged_tb.columns:
-        merged_tb.drop('계정과목', axis=1, inplace=True)
-    final_tb = pd.merge(merged_tb[['계정코드', '계산된_차변잔액', '계산된_대변잔액']],
-                        post_tb_df[['계정코드', '계정과목']],
-                        on='계정코드',
-                        how='left')
+    # 계정코드별 계정과목을 groupby-first로 만든 뒤 map()으로 조회합니다.
+    account_names = post_tb_df.groupby('계정코드', sort=False)['계정과목'].first()
+    final_tb = merged_tb[['계산된_차변잔액', '계산된_대변잔액']].reset_index()
+    final_tb['계정과목'] = final_tb['계정코드'].map(account_names)
     final_tb.rename(columns={'계산된_차변잔액': '차변잔액', '계산된_대변잔액': '대변잔액'}, inplace=True)
     return final_tb[['계정코드', '계정과목', '차변잔액', '대변잔액']]
 
@@ -90,14 +125,14 @@ def scenario_A02_check_dr_cr_balance(journal_df):
         pd.DataFrame: 차대변 금액이 일치하지 않는 전표번호 목록
     """
     # 금액 필드를 숫자형으로 변환
-    journal_df['차변금액'] = pd.to_numeric(journal_df['차변금액'], errors='coerce').fillna(0)
-    journal_df['대변금액'] = pd.to_numeric(journal_df['대변금액'], errors='coerce').fillna(0)
+    amount_cols = ['차변금액', '대변금액']
+    journal_df[amount_cols] = to_numeric_safe(journal_df[amount_cols])
 
     # 전표번호별로 차/대변 합계 계산
-    grouped = journal_df.groupby('전표번호').agg(
-        차변합계=('차변금액', 'sum'),
-        대변합계=('대변금액', 'sum')
-    ).reset_index()
+    grouped = (
+        journal_df.groupby('전표번호', as_index=False)[['차변금액', '대변금액']].sum()
+        .rename(columns={'차변금액': '차변합계', '대변금액': '대변합계'})
+    )
 
     # 차이가 0이 아닌 (불일치하는) 전표만 필터링
     unbalanced_journals = grouped[grouped['차변합계'] != grouped['대변합계']]
@@ -117,13 +152,12 @@ def scenario_JS001_sales_and_purchase_analysis(journal_df, sales_accounts, purch
     Returns:
         pd.DataFrame: 매출과 매입이 동시에 발생한 거래처 목록과 관련 전표
     """
-    # 매출 전표와 매입 전표를 필터링
-    sales_journals = journal_df[journal_df['계정코드'].isin(sales_accounts)]
-    purchase_journals = journal_df[journal_df['계정코드'].isin(purchase_accounts)]
-
-    # 매출이 발생한 거래처와 매입이 발생한 거래처 목록 생성
-    sales_clients = set(sales_journals['거래처코드'].dropna().unique())
-    purchase_clients = set(purchase_journals['거래처코드'].dropna().unique())
+    # 매출 전표와 매입 전표에서 거래처코드 컬럼만 골라 거래처 집합을 만듭니다.
+    # (전표 전체 행을 복사하지 않고 필요한 컬럼 하나만 필터링합니다.)
+    account_codes = journal_df['계정코드']
+    client_codes = journal_df['거래처코드']
+    sales_clients = set(client_codes[account_codes.isin(sales_accounts)].dropna().unique())
+    purchase_clients = set(client_codes[account_codes.isin(purchase_accounts)].dropna().unique())
 
     # 두 목록에 모두 포함된 거래처(교집합)를 찾음
     common_clients = list(sales_clients.intersection(purchase_clients))
@@ -146,10 +180,14 @@ def scenario_JS006_unusual_monthly_sales(journal_df, sales_accounts, threshold_m
         pd.DataFrame: 비경상적인 월 매출이 발생한 거래처의 해당 월 전표
     """
     # 매출 전표만 필터링
-    sales_df = journal_df[journal_df['계정코드'].isin(sales_accounts)].copy()
-    
-    # 날짜 형식 변환 및 '연월' 컬럼 생성
-    sales_df['전표일자'] = pd.to_datetime(sales_df['전표일자'], format='%Y%m%d', errors='coerce')
+    # take로 해당 행을 한 번만 복사합니다. (불리언 인덱싱 후 .copy()를 하면 두 번 복사됩니다.)
+    sales_df = journal_df.take(np.flatnonzero(journal_df['계정코드'].isin(sales_accounts).to_numpy()))
+    # 매출액 집계 전에 금액 필드를 숫자형으로 변환
+    sales_df['대변금액'] = to_numeric_safe(sales_df['대변금액'])
+
+    # 날짜 형식 변환 및 '연월' 컬럼 생성 (이미 datetime64로 변환된 컬럼은 다시 파싱하지 않음)
+    if not pd.api.types.is_datetime64_dtype(sales_df['전표일자']):
+        sales_df['전표일자'] = pd.to_datetime(sales_df['전표일자'], format='%Y%m%d', errors='coerce')
     sales_df.dropna(subset=['전표일자'], inplace=True)
     sales_df['연월'] = sales_df['전표일자'].dt.to_period('M')
 
@@ -157,14 +195,11 @@ def scenario_JS006_unusual_monthly_sales(journal_df, sales_accounts, threshold_m
     monthly_sales = sales_df.groupby(['거래처코드', '연월'])['대변금액'].sum().reset_index()
 
     # 거래처별 평균 월 매출액 계산
-    avg_sales = monthly_sales.groupby('거래처코드')['대변금액'].mean().reset_index()
-    avg_sales.rename(columns={'대변금액': '월평균매출액'}, inplace=True)
-
-    # 월별 매출 데이터와 평균 매출 데이터 병합
-    merged_sales = pd.merge(monthly_sales, avg_sales, on='거래처코드')
+    # transform은 원래 행 순서(인덱스)에 맞춰 결과를 돌려주므로 별도의 병합 없이 바로 붙일 수 있습니다.
+    monthly_sales['월평균매출액'] = monthly_sales.groupby('거래처코드')['대변금액'].transform('mean')
 
     # 평균 대비 특정 월 매출이 임계치를 초과하는 경우 필터링
-    unusual_sales = merged_sales[merged_sales['대변금액'] > merged_sales['월평균매출액'] * threshold_multiplier]
+    unusual_sales = monthly_sales[monthly_sales['대변금액'] > monthly_sales['월평균매출액'] * threshold_multiplier]
 
     # 원본 분개장에서 해당 거래처와 연월의 전표를 추출하여 반환
     result_df = pd.merge(sales_df, unusual_sales[['거래처코드', '연월']], on=['거래처코드', '연월'])
@@ -1,8 +1,65 @@
+import codecs
+import io
 import streamlit as st
 import pandas as pd
 from logic_jet import calculate_trial_balance, scenario_A02_check_dr_cr_balance, scenario_JS001_sales_and_purchase_analysis, scenario_JS006_unusual_monthly_sales
 from logic_comparison import compare_trial_balances
 
+
+def sniff_encoding(uploaded_file, sample_size=65536):
+    """
+    파일 앞부분(기본 64KB)만 읽어 인코딩을 판별합니다. 파일 전체를 한 인코딩으로 읽다가
+    실패한 뒤 다시 읽는 일이 없도록 파싱 전에 한 번만 확인합니다.
+
+    Args:
+        uploaded_file: 업로드된 파일 객체 (읽기 위치는 호출 전 상태로 되돌립니다)
+        sample_size (int): 판별에 사용할 바이트 수
+
+    Returns:
+        str: 'utf-8-sig', 'utf-16', 'utf-8' 또는 'cp949'
+    """
+    pos = uploaded_file.tell()
+    sample = uploaded_file.read(sample_size)
+    uploaded_file.seek(pos)
+
+    if sample.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    # 엑셀의 '유니코드 텍스트' 저장 형식 등 UTF-16 파일은 BOM으로 판별합니다.
+    if sample.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return 'utf-16'
+    try:
+        # 샘플 끝에서 잘린 멀티바이트 문자는 오류로 보지 않도록 증분 디코더를 사용합니다.
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+    except UnicodeDecodeError:
+        return 'cp949'
+    # ASCII만 있는 샘플은 판별이 불가능하므로 기존 기본값(cp949)을 유지합니다.
+    return 'cp949' if sample.isascii() else 'utf-8'
+
+
+@st.cache_data(show_spinner=False, max_entries=6, ttl=3600)
+def load_csv(file_bytes):
+    """
+    업로드된 CSV 파일을 pyarrow 엔진(멀티스레드 파서)으로 읽어 데이터프레임으로 반환합니다.
+    컬럼은 Arrow 기반 dtype으로 유지하여 적요 등 문자열 컬럼의 메모리 사용량을 줄입니다.
+    행마다 열 개수가 다르거나(끝의 쉼표, 생략된 빈 셀) 컬럼명이 중복된 파일은 기본 엔진으로 다시 읽어
+    기존과 같이 처리합니다. (중복 컬럼명은 '계정과목.1'처럼 구분됩니다.)
+
+    파일 내용(bytes)을 키로 결과를 캐시하므로, 같은 파일로 분석을 다시 실행하면 파싱을 건너뜁니다.
+    캐시는 호출마다 복사본을 돌려주므로 분석 함수가 데이터프레임을 수정해도 캐시에는 영향이 없습니다.
+    캐시는 최근 파일 6개(시산표 2개와 분개장 1개, 두 번 분량)까지만, 최대 1시간 동안 보관합니다.
+    """
+    buffer = io.BytesIO(file_bytes)
+    encoding = sniff_encoding(buffer)
+    try:
+        df = pd.read_csv(buffer, encoding=encoding, engine='pyarrow', dtype_backend='pyarrow')
+        if not df.columns.has_duplicates:
+            return df
+    except pd.errors.ParserError:
+        pass
+    buffer.seek(0)
+    return pd.read_csv(buffer, encoding=encoding, dtype_backend='pyarrow')
+
+
 st.set_page_config(layout="wide")
 
 st.title("🔍 회계감사 Journal Entry Test 자동화 툴")
@@ -42,15 +99,22 @@ else:
     if run_button:
         try:
             # 업로드된 파일들을 pandas 데이터프레임으로 읽어옵니다.
-            pre_tb_df = pd.read_csv(pre_tb_file, encoding='cp949')
-            journal_df = pd.read_csv(journal_file, encoding='cp949')
-            post_tb_df = pd.read_csv(post_tb_file, encoding='cp949')
+            pre_tb_df = load_csv(pre_tb_file.getvalue())
+            journal_df = load_csv(journal_file.getvalue())
+            post_tb_df = load_csv(post_tb_file.getvalue())
 
             st.success("모든 파일이 성공적으로 로드되었습니다. 선택한 시나리오 분석을 시작합니다.")
             
             # 선택된 시나리오 ID 목록
             selected_ids = [scenario_options[s] for s in selected_scenarios]
 
+            # 계정과목표(당기 시산표)에서 매출/매입 계정 자동 식별 (JS001, JS006 공통)
+            # JS 시나리오가 선택된 경우에만 계정코드 문자열 변환을 한 번 수행하고 두 시나리오가 결과를 공유합니다.
+            if {"JS001", "JS006"} & set(selected_ids):
+                account_codes = post_tb_df['계정코드'].astype(str)
+                sales_acc = post_tb_df.loc[account_codes.str.startswith('4'), '계정코드'].astype(int).tolist()
+                purchase_acc = post_tb_df.loc[account_codes.str.startswith(('14', '5')), '계정코드'].astype(int).tolist()
+
             # --- 시나리오별 분석 및 결과 출력 ---
             
             # A03: 시산표 검증 (필수 시나리오)
@@ -83,11 +147,6 @@ else:
             # JS001: 매출/매입 동시 발생 거래처 분석
             if "JS001" in selected_ids:
                 with st.expander("JS001: 매출/매입 동시 발생 거래처 분석", expanded=True):
-                    # 계정과목표(당기 시산표)에서 매출/매입 계정 자동 식별
-                    all_accounts = post_tb_df.astype({'계정코드': str})
-                    sales_acc = all_accounts[all_accounts['계정코드'].str.startswith('4')]['계정코드'].astype(int).tolist()
-                    purchase_acc = all_accounts[all_accounts['계정코드'].str.startswith('14') | all_accounts['계정코드'].str.startswith('5')]['계정코드'].astype(int).tolist()
-                    
                     st.write(f"매출 계정(4xxxx) {len(sales_acc)}개, 매입/원가 관련 계정(14xxx, 5xxxx) {len(purchase_acc)}개를 대상으로 분석합니다.")
                     
                     with st.spinner('매출과 매입이 동시에 발생한 거래처를 분석하는 중입니다...'):
@@ -102,9 +161,6 @@ else:
             # JS006: 비경상적 월 매출 트렌드 분석
             if "JS006" in selected_ids:
                  with st.expander("JS006: 비경상적 월 매출 트렌드 분석", expanded=True):
-                    all_accounts = post_tb_df.astype({'계정코드': str})
-                    sales_acc = all_accounts[all_accounts['계정코드'].str.startswith('4')]['계정코드'].astype(int).tolist()
-                    
                     multiplier = st.slider("월평균 매출액 대비 배수 설정", 1.0, 10.0, 3.0, 0.5)
                     st.write(f"월평균 매출액의 **{multiplier}배**를 초과하는 월 매출이 발생한 거래처를 탐지합니다.")
 